@@ -6,12 +6,22 @@ Downloads HRSI FSC (High Resolution Snow & Ice - Fractional Snow Cover) products
 
 import os
 import json
+import time
+import asyncio
+import threading
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pathlib import Path
+from urllib.parse import urlparse
 
 from pystac_client import Client
+from pystac_client.conformance import ConformanceClasses
+import pandas as pd
+import aiofiles
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
 
@@ -24,6 +34,16 @@ class CopernicusDataAcquisition:
     
     STAC_API_URL = "https://catalogue.dataspace.copernicus.eu/stac"
     COLLECTION_ID = "HRSI-SWS-FSC"  # Fractional Snow Cover collection
+    ASSET_KEYS = ["fsc", "data", "visual", "thumbnail"]  # In order of preference
+    MAX_CONCURRENT_DOWNLOADS = int(os.getenv("MAX_CONCURRENT_DOWNLOADS", "16"))
+    DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB, COG products are tens of MB
+    STREAM_COGS = os.getenv("STREAM_COGS", "true").lower() == "true"
+    STREAM_EXTENSIONS = (".tif", ".tiff")  # Also whitelisted for GDAL /vsicurl/
+    
+    # Backoff policy on throttling / server errors (token requests and downloads)
+    RETRY_STATUSES = [429, 500, 502, 503, 504]
+    MAX_RETRIES = 3
+    BACKOFF_FACTOR = 0.5
     
     def __init__(self):
         self.username = os.getenv("CDSE_USERNAME")
@@ -39,12 +59,44 @@ class CopernicusDataAcquisition:
         # Metadata cache
         self.metadata_file = project_dir / "data" / "acquisition_metadata.json"
         
+        # Access token cache (shared by all download tasks)
+        self._token = None
+        self._token_exp = 0
+        self._token_lock = threading.Lock()
+        
+        # Shared HTTP session: keep-alive connection pool + backoff on 429/5xx
+        self.http = requests.Session()
+        self.http.mount("https://", HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=64,
+            max_retries=Retry(
+                total=self.MAX_RETRIES,
+                backoff_factor=self.BACKOFF_FACTOR,
+                status_forcelist=self.RETRY_STATUSES,
+                allowed_methods=["GET", "POST"]
+            )
+        ))
+        
     def _parse_bbox(self, bbox_str: str) -> List[float]:
         """Parse bounding box from string 'west,south,east,north'"""
         return [float(x) for x in bbox_str.split(",")]
     
-    def _get_access_token(self) -> str:
-        """Authenticate with CDSE and get access token"""
+    def can_stream(self, asset) -> bool:
+        """Whether an asset is a COG that GDAL can read through /vsicurl/"""
+        path = urlparse(asset.href).path.lower()
+        return "cloud-optimized" in (asset.media_type or "") and path.endswith(self.STREAM_EXTENSIONS)
+    
+    def get_access_token(self) -> str:
+        """Authenticate with CDSE and get access token (cached until expiry)"""
+        with self._token_lock:
+            # Refresh 30s before expiry so in-flight downloads don't get a stale token
+            if self._token and time.monotonic() < self._token_exp - 30:
+                return self._token
+            
+            return self._request_access_token()
+    
+    def _request_access_token(self) -> str:
+        """Request a new access token from the CDSE identity server"""
         auth_url = "https://identity.dataspace.copernicus.eu/auth/realms/CDSE/protocol/openid-connect/token"
         
         data = {
@@ -54,10 +106,14 @@ class CopernicusDataAcquisition:
             "client_id": "cdse-public"
         }
         
-        response = requests.post(auth_url, data=data)
+        response = self.http.post(auth_url, data=data)
         response.raise_for_status()
         
-        return response.json()["access_token"]
+        token_data = response.json()
+        self._token = token_data["access_token"]
+        self._token_exp = time.monotonic() + token_data.get("expires_in", 600)
+        
+        return self._token
     
     def search_products(self, date_range: str) -> List[Dict]:
         """
@@ -75,20 +131,46 @@ class CopernicusDataAcquisition:
         # Connect to STAC catalog
         catalog = Client.open(self.STAC_API_URL)
         
+        search_params = {}
+        
+        # Only return the fields we use, when the API supports it
+        if catalog.conforms_to(ConformanceClasses.FIELDS):
+            search_params["fields"] = {
+                "include": [
+                    "type", "stac_version", "id", "geometry", "bbox", "links",
+                    "properties.datetime", "properties.eo:cloud_cover",
+                    *(f"assets.{key}" for key in self.ASSET_KEYS)
+                ]
+            }
+        
+        # Filter by cloud coverage server-side, when the API supports it
+        # (items without cloud cover information are kept)
+        if catalog.conforms_to(ConformanceClasses.FILTER):
+            cloud_cover = {"property": "eo:cloud_cover"}
+            search_params["filter"] = {
+                "op": "or",
+                "args": [
+                    {"op": "isNull", "args": [cloud_cover]},
+                    {"op": "<=", "args": [cloud_cover, self.cloud_cover_max]}
+                ]
+            }
+            search_params["filter_lang"] = "cql2-json"
+        
         # Search for items
         search = catalog.search(
             collections=[self.COLLECTION_ID],
             bbox=self.aoi_bbox,
             datetime=date_range,
-            max_items=100
+            max_items=100,
+            **search_params
         )
         
         items = list(search.items())
         
-        # Filter by cloud coverage if available
+        # Filter by cloud coverage if available (no-op when filtered server-side)
         filtered_items = []
         for item in items:
-            cloud_cover = item.properties.get("eo:cloud_cover", 0)
+            cloud_cover = item.properties.get("eo:cloud_cover") or 0
             if cloud_cover <= self.cloud_cover_max:
                 filtered_items.append(item)
         
@@ -96,26 +178,32 @@ class CopernicusDataAcquisition:
         
         return filtered_items
     
-    def download_product(self, item) -> str:
+    async def _download_product(
+        self,
+        session: aiohttp.ClientSession,
+        sem: asyncio.Semaphore,
+        item,
+        item_date: pd.Timestamp
+    ) -> Dict:
         """
         Download FSC product (COG file)
         
+        Cloud Optimized GeoTIFFs are not downloaded when STREAM_COGS is set:
+        the raster processor reads them through /vsicurl/ and only fetches
+        the tiles covering the massifs. GDAL only opens STREAM_EXTENSIONS
+        remotely, other hrefs are always downloaded.
+        
         Args:
+            session: Shared aiohttp session
+            sem: Semaphore bounding the number of concurrent downloads
             item: STAC item
+            item_date: Parsed acquisition datetime of the item
         
         Returns:
-            Path to downloaded file
+            {"file_path": local path} or {"download_url": COG url}
         """
-        # Get the FSC asset (Cloud Optimized GeoTIFF)
-        asset_key = "fsc"  # Fractional Snow Cover
-        
-        if asset_key not in item.assets:
-            # Try alternative keys
-            possible_keys = ["data", "visual", "thumbnail"]
-            for key in possible_keys:
-                if key in item.assets:
-                    asset_key = key
-                    break
+        # Get the FSC asset (Cloud Optimized GeoTIFF), or an alternative key
+        asset_key = next((key for key in self.ASSET_KEYS if key in item.assets), None)
         
         asset = item.assets.get(asset_key)
         if not asset:
@@ -125,41 +213,110 @@ class CopernicusDataAcquisition:
         # Download URL
         download_url = asset.href
         
-        # Create filename
-        item_date = item.properties.get("datetime", "unknown")
-        if isinstance(item_date, str):
-            item_date = datetime.fromisoformat(item_date.replace("Z", "+00:00"))
+        if self.STREAM_COGS and self.can_stream(asset):
+            print(f"   Streaming remotely: {item.id}")
+            return {"download_url": download_url}
         
+        # Create filename
         filename = f"fsc_{item_date.strftime('%Y%m%d')}_{item.id[:8]}.tif"
         output_path = self.output_dir / filename
         
         # Skip if already downloaded
         if output_path.exists():
             print(f"   Already downloaded: {filename}")
-            return str(output_path)
-        
-        print(f"   Downloading: {filename}")
+            return {"file_path": str(output_path)}
         
         try:
-            # Get access token for authenticated download
-            token = self._get_access_token()
-            headers = {"Authorization": f"Bearer {token}"}
-            
-            # Stream download
-            response = requests.get(download_url, headers=headers, stream=True)
-            response.raise_for_status()
-            
-            with open(output_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            async with sem:
+                print(f"   Downloading: {filename}")
+                
+                for attempt in range(self.MAX_RETRIES + 1):
+                    # Get access token for authenticated download
+                    token = await asyncio.to_thread(self.get_access_token)
+                    headers = {"Authorization": f"Bearer {token}"}
+                    
+                    # Stream download
+                    async with session.get(download_url, headers=headers) as response:
+                        retry = (
+                            response.status in self.RETRY_STATUSES
+                            and attempt < self.MAX_RETRIES
+                        )
+                        
+                        if not retry:
+                            response.raise_for_status()
+                            
+                            async with aiofiles.open(
+                                output_path, "wb", buffering=self.DOWNLOAD_CHUNK_SIZE
+                            ) as f:
+                                async for chunk in response.content.iter_chunked(self.DOWNLOAD_CHUNK_SIZE):
+                                    await f.write(chunk)
+                            break
+                    
+                    # Exponential backoff, keeping the semaphore slot to ease the load
+                    delay = self.BACKOFF_FACTOR * 2 ** attempt
+                    print(f"   HTTP {response.status} for {filename}, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
             
             print(f"   Downloaded: {filename}")
-            return str(output_path)
+            return {"file_path": str(output_path)}
             
         except Exception as e:
             print(f"   Error downloading {filename}: {e}")
+            # Don't leave a truncated file behind, it would be skipped next run
+            output_path.unlink(missing_ok=True)
             return None
     
+    def _product_entry(self, item, location: Dict) -> Dict:
+        """Metadata entry describing an acquired product"""
+        return {
+            **location,
+            "item_id": item.id,
+            "datetime": item.properties.get("datetime"),
+            "cloud_cover": item.properties.get("eo:cloud_cover") or 0
+        }
+    
+    async def _download_products(
+        self,
+        items: List,
+        queue: Optional[asyncio.Queue] = None
+    ) -> List[Dict]:
+        """
+        Download several products concurrently
+        
+        Args:
+            items: STAC items to download
+            queue: Optional queue receiving each product entry as soon as
+                its download completes
+        
+        Returns:
+            List of product locations (None for failures), in item order
+        """
+        # Parse all item datetimes in one vectorized call
+        item_dates = pd.to_datetime(
+            [item.properties.get("datetime") for item in items], utc=True, format="ISO8601"
+        )
+        
+        sem = asyncio.Semaphore(self.MAX_CONCURRENT_DOWNLOADS)
+        connector = aiohttp.TCPConnector(limit=256, limit_per_host=64)
+        
+        async def download(session, item, item_date):
+            location = await self._download_product(session, sem, item, item_date)
+            if location and queue is not None:
+                await queue.put(self._product_entry(item, location))
+            return location
+        
+        # No total limit (large products on a shared link can take a while),
+        # only fail on stalled connections
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=120)
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            return await asyncio.gather(
+                *(
+                    download(session, item, item_date)
+                    for item, item_date in zip(items, item_dates)
+                )
+            )
+    
     def acquire_data(self, date_ranges: List[str]) -> Dict:
         """
         Main acquisition workflow
@@ -167,6 +324,24 @@ class CopernicusDataAcquisition:
         Args:
             date_ranges: List of date ranges to process
         
+        Returns:
+            Dictionary with metadata about acquired products
+        """
+        return asyncio.run(self.acquire_data_async(date_ranges))
+    
+    async def acquire_data_async(
+        self,
+        date_ranges: List[str],
+        queue: Optional[asyncio.Queue] = None
+    ) -> Dict:
+        """
+        Main acquisition workflow, as a coroutine
+        
+        Args:
+            date_ranges: List of date ranges to process
+            queue: Optional queue receiving each product entry as soon as it
+                is acquired, so later stages can start before the end
+        
         Returns:
             Dictionary with metadata about acquired products
         """
@@ -183,19 +358,16 @@ class CopernicusDataAcquisition:
             print(f"{'='*60}")
             
             # Search for products
-            items = self.search_products(date_range)
+            items = await asyncio.to_thread(self.search_products, date_range)
             
             # Download products
-            downloaded = []
-            for item in items:
-                file_path = self.download_product(item)
-                if file_path:
-                    downloaded.append({
-                        "file_path": file_path,
-                        "item_id": item.id,
-                        "datetime": item.properties.get("datetime"),
-                        "cloud_cover": item.properties.get("eo:cloud_cover", 0)
-                    })
+            locations = await self._download_products(items, queue)
+            
+            downloaded = [
+                self._product_entry(item, location)
+                for item, location in zip(items, locations)
+                if location
+            ]
             
             metadata["date_ranges"][date_range] = {
                 "total_found": len(items),
@@ -216,14 +388,20 @@ class CopernicusDataAcquisition:
         return metadata
 
 
-def main():
-    """Main entry point"""
+def get_date_ranges() -> List[str]:
+    """Get date ranges to compare from environment"""
     
-    # Get date ranges from environment
     date_range_1 = os.getenv("DATE_RANGE_1", "2024-01-01/2024-01-31")
     date_range_2 = os.getenv("DATE_RANGE_2", "2025-01-01/2025-01-31")
     
-    date_ranges = [date_range_1, date_range_2]
+    return [date_range_1, date_range_2]
+
+
+def main():
+    """Main entry point"""
+    
+    # Get date ranges from environment
+    date_ranges = get_date_ranges()
     
     # Initialize acquisition
     acquirer = CopernicusDataAcquisition()
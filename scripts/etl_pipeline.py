@@ -4,9 +4,14 @@ Main script that coordinates the entire ETL workflow:
 1. Data Acquisition from Copernicus
 2. Raster Processing (zonal statistics)
 3. Database Ingestion to PostGIS
+
+The three stages run concurrently, connected by queues: rasters are
+processed as soon as they are acquired, and their statistics are ingested
+as soon as they are computed.
 """
 
 import sys
+import asyncio
 import logging
 from pathlib import Path
 
@@ -27,6 +32,48 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def run_pipeline():
+    """Run acquisition, processing and ingestion as a concurrent pipeline"""
+    
+    acquirer = acquire_data.CopernicusDataAcquisition()
+    processor = process_raster.RasterProcessor()
+    ingestor = ingest_to_db.DatabaseIngestor()
+    
+    if not ingestor.test_connection():
+        raise ConnectionError("Cannot connect to database")
+    
+    # acquisition -> raster_queue -> processing -> stats_queue -> ingestion
+    raster_queue = asyncio.Queue()
+    stats_queue = asyncio.Queue()
+    
+    process_task = asyncio.create_task(processor.process_queue(raster_queue, stats_queue))
+    ingest_task = asyncio.create_task(ingestor.ingest_queue(stats_queue, if_exists='append'))
+    
+    try:
+        try:
+            logger.info("Starting data acquisition from Copernicus...")
+            metadata = await acquirer.acquire_data_async(acquire_data.get_date_ranges(), raster_queue)
+        finally:
+            # End of acquisition, let the other stages drain their queues
+            await raster_queue.put(None)
+    finally:
+        # Both stages always terminate once the end marker is queued
+        stage_results = await asyncio.gather(process_task, ingest_task, return_exceptions=True)
+        
+        # A committed load has dropped the secondary indexes: rebuild them
+        # even if a stage failed, so the table is never left without them
+        if ingestor.indexes_dropped:
+            ingestor.create_indexes()
+    
+    for stage_result in stage_results:
+        if isinstance(stage_result, BaseException):
+            raise stage_result
+    
+    results = stage_results[0]
+    
+    return metadata, results
+
+
 def main():
     """Main ETL pipeline orchestration"""
     
@@ -35,12 +82,10 @@ def main():
     print("="*60 + "\n")
     
     try:
-        # Step 1: Data Acquisition
-        print("\nSTEP 1/3: Data Acquisition")
+        print("\nSTEPS 1-3/3: Acquisition, Raster Processing, Database Ingestion")
         print("-" * 60)
         
-        logger.info("Starting data acquisition from Copernicus...")
-        metadata = acquire_data.main()
+        metadata, results = asyncio.run(run_pipeline())
         
         if not metadata or not metadata.get('downloaded_files'):
             logger.warning("No data downloaded. Check your credentials and AOI settings.")
@@ -48,26 +93,11 @@ def main():
         
         logger.info(f"Acquired {len(metadata['downloaded_files'])} files")
         
-        # Step 2: Raster Processing
-        print("\nSTEP 2/3: Raster Processing")
-        print("-" * 60)
-        
-        logger.info("Starting raster processing...")
-        results = process_raster.main()
-        
         if results is None or len(results) == 0:
             logger.error("No results from raster processing")
             return
         
         logger.info(f"Processed {len(results)} observations")
-        
-        # Step 3: Database Ingestion
-        print("\nSTEP 3/3: Database Ingestion")
-        print("-" * 60)
-        
-        logger.info("Starting database ingestion...")
-        ingest_to_db.main()
-        
         logger.info("Data ingested successfully")
         
         # Success summary
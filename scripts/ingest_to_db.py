@@ -3,12 +3,14 @@ Database Ingestion Module
 Loads processed snow statistics into PostGIS database
 """
 
+import io
 import os
+import asyncio
 from pathlib import Path
 from typing import Optional
 
 import geopandas as gpd
-import psycopg2
+import shapely
 from psycopg2 import sql as psycopg_sql
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
@@ -21,6 +23,10 @@ load_dotenv()
 class DatabaseIngestor:
     """Handles data ingestion into PostGIS"""
     
+    TABLE_NAME = "snow_analysis"
+    COLUMNS = ['massif_name', 'date_obs', 'snow_percent', 'snow_area_km2', 'geometry']
+    INDEXES = ['sidx_snow_geom', 'idx_massif_date', 'idx_date', 'idx_massif_name']
+    
     def __init__(self):
         # Database connection parameters
         self.db_host = os.getenv("POSTGRES_HOST", "localhost")
@@ -31,13 +37,25 @@ class DatabaseIngestor:
         
         # Data file (local path)
         project_dir = Path(__file__).parent.parent
-        self.data_file = project_dir / "data" / "processed_stats.geojson"
+        self.data_file = project_dir / "data" / "processed_stats.parquet"
+        self.legacy_data_file = project_dir / "data" / "processed_stats.geojson"
         
         # SQLAlchemy connection string
         self.connection_string = (
             f"postgresql://{self.db_user}:{self.db_password}@"
             f"{self.db_host}:{self.db_port}/{self.db_name}"
         )
+        
+        # Set once a pipeline load has dropped the secondary indexes
+        self.indexes_dropped = False
+        
+        # Single pooled engine shared by all methods
+        self.engine = create_engine(
+            self.connection_string,
+            pool_size=5,
+            max_overflow=5,
+            pool_pre_ping=True
+        )
     
     def test_connection(self) -> bool:
         """Test database connection"""
@@ -45,20 +63,8 @@ class DatabaseIngestor:
         print("Testing database connection...")
         
         try:
-            conn = psycopg2.connect(
-                host=self.db_host,
-                port=self.db_port,
-                dbname=self.db_name,
-                user=self.db_user,
-                password=self.db_password
-            )
-            
-            cursor = conn.cursor()
-            cursor.execute("SELECT PostGIS_Version();")
-            version = cursor.fetchone()[0]
-            
-            cursor.close()
-            conn.close()
+            with self.engine.begin() as conn:
+                version = conn.exec_driver_sql("SELECT PostGIS_Version();").scalar()
             
             print(f"   Connected to PostGIS")
             print(f"   Version: {version}")
@@ -72,16 +78,21 @@ class DatabaseIngestor:
     def load_processed_data(self) -> Optional[gpd.GeoDataFrame]:
         """Load processed statistics from file"""
         
-        if not self.data_file.exists():
+        if self.data_file.exists():
+            print(f"\nLoading processed data from: {self.data_file}")
+            gdf = gpd.read_parquet(self.data_file)
+        
+        # Outputs written before the GeoParquet switch
+        elif self.legacy_data_file.exists():
+            print(f"\nLoading processed data from: {self.legacy_data_file}")
+            gdf = gpd.read_file(self.legacy_data_file)
+        
+        else:
             raise FileNotFoundError(
                 f"Processed data file not found: {self.data_file}\n"
                 "Please run process_raster.py first"
             )
         
-        print(f"\nLoading processed data from: {self.data_file}")
-        
-        gdf = gpd.read_file(self.data_file)
-        
         print(f"   Loaded {len(gdf)} observations")
         print(f"   Columns: {list(gdf.columns)}")
         
@@ -100,107 +111,263 @@ class DatabaseIngestor:
         print("Starting Database Ingestion")
         print(f"{'='*60}\n")
         
-        # Ensure CRS is set
-        if gdf.crs is None:
-            gdf.set_crs("EPSG:4326", inplace=True)
-        
-        # Convert date_obs to proper datetime if it's not already
-        if 'date_obs' in gdf.columns:
-            gdf['date_obs'] = gpd.pd.to_datetime(gdf['date_obs'])
-        
-        # Create SQLAlchemy engine
-        engine = create_engine(self.connection_string)
+        self._prepare_gdf(gdf)
         
         # Ingest to PostGIS
-        table_name = "snow_analysis"
+        table_name = self.TABLE_NAME
         
         print(f"Ingesting to table: {table_name}")
         print(f"   Mode: {if_exists}")
         
         try:
-            gdf.to_postgis(
-                name=table_name,
-                con=engine,
-                if_exists=if_exists,
-                index=False,
-                dtype={'geometry': 'Geometry'}
-            )
+            # Single transaction: secondary indexes are dropped for the
+            # load and rebuilt once afterwards by create_indexes()
+            with self.engine.begin() as conn, conn.connection.cursor() as cursor:
+                cursor.execute("SET LOCAL synchronous_commit = off")
+                self._prepare_table(cursor, if_exists)
+                self._drop_indexes(cursor)
+                self._copy_rows(cursor, gdf)
             
             print(f"   Ingested {len(gdf)} rows")
             
-            # Get table statistics
-            with engine.connect() as conn:
-                result = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
-                total_rows = result.fetchone()[0]
-                
-                result = conn.execute(text(
-                    f"SELECT COUNT(DISTINCT massif_name) FROM {table_name}"
-                ))
-                unique_massifs = result.fetchone()[0]
-                
-                result = conn.execute(text(
-                    f"SELECT MIN(date_obs), MAX(date_obs) FROM {table_name}"
-                ))
-                date_range = result.fetchone()
-            
-            print(f"\nDatabase Statistics:")
-            print(f"   Total rows: {total_rows}")
-            print(f"   Unique massifs: {unique_massifs}")
-            print(f"   Date range: {date_range[0]} to {date_range[1]}")
+            self._print_table_stats()
             
         except Exception as e:
             print(f"   Ingestion failed: {e}")
             raise
         
-        finally:
-            engine.dispose()
-        
         print(f"\n{'='*60}")
         print("Ingestion complete!")
         print(f"{'='*60}\n")
     
-    def create_indexes(self) -> None:
-        """Create additional indexes for performance"""
+    async def ingest_queue(
+        self,
+        queue: asyncio.Queue,
+        if_exists: str = 'append',
+        batch_size: int = 1_000
+    ) -> int:
+        """
+        Ingest observations as they are produced (pipeline mode)
         
-        print("\nCreating indexes...")
+        GeoDataFrames read from the queue are accumulated and loaded with
+        COPY every batch_size rows. None marks the end of the queue.
+        The whole stream is loaded in one transaction, committed once the
+        queue ends and rolled back if anything fails, so a failed run leaves
+        the table as it was. A committed load has dropped the secondary
+        indexes, call create_indexes() afterwards.
+        
+        Args:
+            queue: Queue of GeoDataFrames to ingest
+            if_exists: How to handle existing table ('replace', 'append', 'fail')
+            batch_size: Number of rows per COPY
+        
+        Returns:
+            Number of ingested rows
+        """
+        
+        print(f"\n{'='*60}")
+        print("Starting Database Ingestion (pipeline mode)")
+        print(f"{'='*60}\n")
+        
+        def begin():
+            conn = self.engine.connect()
+            trans = conn.begin()
+            cursor = conn.connection.cursor()
+            cursor.execute("SET LOCAL synchronous_commit = off")
+            self._prepare_table(cursor, if_exists)
+            self._drop_indexes(cursor)
+            return conn, trans, cursor
+        
+        def flush(cursor, batch):
+            gdf = self._prepare_gdf(gpd.pd.concat(batch, ignore_index=True))
+            self._copy_rows(cursor, gdf)
+        
+        def end(conn, trans, cursor, commit):
+            try:
+                cursor.close()
+                if commit:
+                    trans.commit()
+                else:
+                    trans.rollback()
+            finally:
+                conn.close()
+        
+        # (connection, transaction, cursor), opened with the first batch
+        load = None
+        batch = []
+        batch_rows = 0
+        total_rows = 0
         
         try:
-            conn = psycopg2.connect(
-                host=self.db_host,
-                port=self.db_port,
-                dbname=self.db_name,
-                user=self.db_user,
-                password=self.db_password
-            )
-            
-            cursor = conn.cursor()
-            
-            # Spatial index (if not already created)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS sidx_snow_geom 
-                ON snow_analysis USING GIST (geometry)
-            """)
+            while True:
+                gdf = await queue.get()
+                if gdf is not None:
+                    batch.append(gdf)
+                    batch_rows += len(gdf)
+                
+                if batch and (gdf is None or batch_rows >= batch_size):
+                    if load is None:
+                        load = await asyncio.to_thread(begin)
+                    await asyncio.to_thread(flush, load[2], batch)
+                    total_rows += batch_rows
+                    print(f"   Loaded {batch_rows} rows ({total_rows} total)")
+                    batch = []
+                    batch_rows = 0
+                
+                if gdf is None:
+                    break
             
-            # Index on massif name and date
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_massif_date 
-                ON snow_analysis (massif_name, date_obs)
-            """)
+            if load is not None:
+                conn, trans, cursor = load
+                load = None
+                await asyncio.to_thread(end, conn, trans, cursor, True)
+                
+                # Committed: the indexes must be rebuilt by create_indexes()
+                self.indexes_dropped = True
+        finally:
+            if load is not None:
+                # Roll the whole stream back, dropped indexes included
+                await asyncio.to_thread(end, *load, False)
+        
+        if total_rows:
+            print(f"Committed {total_rows} rows")
+            self._print_table_stats()
+        
+        return total_rows
+    
+    def _prepare_gdf(self, gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+        """Normalize CRS and dates before loading"""
+        
+        # Ensure CRS is set
+        if gdf.crs is None:
+            gdf.set_crs("EPSG:4326", inplace=True)
+        
+        # Convert date_obs to proper datetime if it's not already
+        if 'date_obs' in gdf.columns:
+            gdf['date_obs'] = gpd.pd.to_datetime(gdf['date_obs'])
+        
+        return gdf
+    
+    def _drop_indexes(self, cursor) -> None:
+        """Drop secondary indexes, they are rebuilt by create_indexes()"""
+        
+        cursor.execute(psycopg_sql.SQL("DROP INDEX IF EXISTS {}").format(
+            psycopg_sql.SQL(', ').join(map(psycopg_sql.Identifier, self.INDEXES))
+        ))
+    
+    def _print_table_stats(self) -> None:
+        """Print row count, massifs and date range of the table"""
+        
+        with self.engine.connect() as conn:
+            result = conn.execute(text(f"SELECT COUNT(*) FROM {self.TABLE_NAME}"))
+            total_rows = result.fetchone()[0]
             
-            # Index on date only
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_date 
-                ON snow_analysis (date_obs)
-            """)
+            result = conn.execute(text(
+                f"SELECT COUNT(DISTINCT massif_name) FROM {self.TABLE_NAME}"
+            ))
+            unique_massifs = result.fetchone()[0]
             
-            conn.commit()
-            cursor.close()
-            conn.close()
+            result = conn.execute(text(
+                f"SELECT MIN(date_obs), MAX(date_obs) FROM {self.TABLE_NAME}"
+            ))
+            date_range = result.fetchone()
+        
+        print(f"\nDatabase Statistics:")
+        print(f"   Total rows: {total_rows}")
+        print(f"   Unique massifs: {unique_massifs}")
+        print(f"   Date range: {date_range[0]} to {date_range[1]}")
+    
+    def _prepare_table(self, cursor, if_exists: str) -> None:
+        """Create the table if needed and apply the if_exists policy"""
+        
+        cursor.execute("SELECT to_regclass(%s)", (self.TABLE_NAME,))
+        exists = cursor.fetchone()[0] is not None
+        
+        if exists and if_exists == 'fail':
+            raise ValueError(f"Table '{self.TABLE_NAME}' already exists")
+        
+        # Same schema as sql/init_db.sql
+        cursor.execute(psycopg_sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {} (
+                id SERIAL PRIMARY KEY,
+                massif_name VARCHAR(100) NOT NULL,
+                date_obs DATE NOT NULL,
+                snow_percent FLOAT CHECK (snow_percent >= 0 AND snow_percent <= 100),
+                snow_area_km2 FLOAT CHECK (snow_area_km2 >= 0),
+                geometry GEOMETRY(MultiPolygon, 4326),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(massif_name, date_obs)
+            )
+        """).format(psycopg_sql.Identifier(self.TABLE_NAME)))
+        
+        if exists and if_exists == 'replace':
+            cursor.execute(psycopg_sql.SQL("TRUNCATE {} RESTART IDENTITY").format(
+                psycopg_sql.Identifier(self.TABLE_NAME)
+            ))
+    
+    def _copy_rows(self, cursor, gdf: gpd.GeoDataFrame) -> None:
+        """Bulk load rows with COPY (geometries sent as hex EWKB)"""
+        
+        geometries = shapely.set_srid(gdf.geometry.to_numpy(), gdf.crs.to_epsg())
+        
+        # Plain DataFrame so the geometry column can hold EWKB strings
+        buf = io.StringIO()
+        gpd.pd.DataFrame(gdf[self.COLUMNS]).assign(
+            geometry=shapely.to_wkb(geometries, hex=True, include_srid=True)
+        ).to_csv(buf, sep='\t', header=False, index=False)
+        buf.seek(0)
+        
+        cursor.copy_expert(
+            psycopg_sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT CSV, DELIMITER E'\\t')").format(
+                psycopg_sql.Identifier(self.TABLE_NAME),
+                psycopg_sql.SQL(', ').join(map(psycopg_sql.Identifier, self.COLUMNS))
+            ),
+            buf
+        )
+    
+    def create_indexes(self) -> None:
+        """Create additional indexes for performance (run after bulk load)"""
+        
+        print("\nCreating indexes...")
+        
+        try:
+            with self.engine.begin() as conn:
+                # More memory makes the index builds much faster
+                conn.exec_driver_sql("SET LOCAL maintenance_work_mem = '512MB'")
+                
+                # Spatial index (if not already created)
+                conn.exec_driver_sql("""
+                    CREATE INDEX IF NOT EXISTS sidx_snow_geom 
+                    ON snow_analysis USING GIST (geometry)
+                """)
+                
+                # Index on massif name and date
+                conn.exec_driver_sql("""
+                    CREATE INDEX IF NOT EXISTS idx_massif_date 
+                    ON snow_analysis (massif_name, date_obs)
+                """)
+                
+                # Index on date only
+                conn.exec_driver_sql("""
+                    CREATE INDEX IF NOT EXISTS idx_date 
+                    ON snow_analysis (date_obs)
+                """)
+                
+                # Index on massif name for filtering
+                conn.exec_driver_sql("""
+                    CREATE INDEX IF NOT EXISTS idx_massif_name 
+                    ON snow_analysis (massif_name)
+                """)
+                
+                # Refresh planner statistics after the bulk load
+                conn.exec_driver_sql("ANALYZE snow_analysis")
             
             print("   Indexes created successfully")
             
         except Exception as e:
-            print(f"   Index creation warning: {e}")
+            # Indexes are dropped for every load, a failed rebuild must not go unnoticed
+            print(f"   Index creation failed: {e}")
+            raise
 
 
 def main():
@@ -6,13 +6,20 @@ Computes zonal statistics for each mountain massif
 
 import os
 import json
+import math
+import hashlib
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import geopandas as gpd
 import rasterio
 from rasterio.mask import mask
-from rasterstats import zonal_stats
+from rasterio.features import rasterize
+from rasterio.errors import WindowError
+from rasterio.windows import Window, from_bounds
 import numpy as np
 import pandas as pd
 from shapely.geometry import mapping
@@ -21,13 +28,28 @@ from shapely.geometry import mapping
 class RasterProcessor:
     """Process snow cover rasters and compute statistics by massif"""
     
+    NODATA = 255  # Common nodata value for HRSI products
+    STRIP_ROWS = 1024  # Rows reduced at a time when computing zonal stats
+    STATS_VERSION = 1  # Bump when the stats computation changes, invalidates the cache
+    
     def __init__(self):
         project_dir = Path(__file__).parent.parent
         self.data_dir = project_dir / "data"
         self.rasters_dir = self.data_dir / "rasters"
         self.massifs_file = self.data_dir / "massifs" / "alpine_massifs.geojson"
         self.metadata_file = self.data_dir / "acquisition_metadata.json"
-        self.output_file = self.data_dir / "processed_stats.geojson"
+        self.output_file = self.data_dir / "processed_stats.parquet"
+        
+        # Per-raster stats cache, so unchanged rasters are not processed again
+        self.manifest_file = self.data_dir / "processed_stats.manifest.json"
+        self.cache_dir = self.data_dir / "cache"
+        
+        # CDSE client, only needed to authenticate remote (/vsicurl/) reads
+        self._cdse = None
+        
+        # Massifs reprojected to each raster CRS seen so far, keyed by
+        # (massifs frame id, CRS); the source frame is kept to check identity
+        self._massif_cache: Dict[tuple, tuple] = {}
         
     def load_massifs(self) -> gpd.GeoDataFrame:
         """Load mountain massifs geometries"""
@@ -47,6 +69,10 @@ class RasterProcessor:
         elif massifs_gdf.crs.to_epsg() != 4326:
             massifs_gdf = massifs_gdf.to_crs("EPSG:4326")
         
+        # If massif_name doesn't exist, try 'name'
+        if 'massif_name' not in massifs_gdf.columns and 'name' in massifs_gdf.columns:
+            massifs_gdf['massif_name'] = massifs_gdf['name']
+        
         print(f"   Loaded {len(massifs_gdf)} massifs")
         
         return massifs_gdf
@@ -65,76 +91,200 @@ class RasterProcessor:
         
         return metadata.get("downloaded_files", [])
     
+    def load_manifest(self) -> Dict:
+        """Load the manifest of already processed rasters"""
+        
+        if not self.manifest_file.exists():
+            return {}
+        
+        try:
+            with open(self.manifest_file, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            # Unreadable manifest: process everything again, it is rewritten
+            print(f"Ignoring unreadable manifest {self.manifest_file}: {e}")
+            return {}
+        
+        if not isinstance(manifest, dict):
+            return {}
+        
+        # Drop entries whose cached stats are gone
+        return {
+            key: source for key, source in manifest.items()
+            if (self.cache_dir / f"{key}.parquet").exists()
+        }
+    
+    def _cache_key(self, raster_info: Dict) -> Optional[str]:
+        """
+        Hash identifying a raster version and the massifs it was processed with
+        
+        The key also covers STATS_VERSION, so stats cached by an older
+        computation are not reused. Local files are identified by path, size and mtime, remote COGs by URL.
+        Returns None when the raster can't be identified (e.g. missing file).
+        """
+        
+        try:
+            if raster_info.get('file_path'):
+                path = raster_info['file_path']
+                source = [path, os.path.getsize(path), int(os.path.getmtime(path))]
+            else:
+                source = [raster_info['download_url']]
+            
+            massifs_stat = self.massifs_file.stat()
+            source += [str(self.massifs_file), massifs_stat.st_size, int(massifs_stat.st_mtime)]
+            source.append(self.STATS_VERSION)
+        except (OSError, KeyError):
+            return None
+        
+        return hashlib.sha256(json.dumps(source).encode()).hexdigest()
+    
+    @staticmethod
+    def _label_dtype(n_labels: int) -> str:
+        """Smallest unsigned dtype able to hold massif labels 0..n_labels-1"""
+        
+        if n_labels <= np.iinfo(np.uint8).max + 1:
+            return 'uint8'
+        if n_labels <= np.iinfo(np.uint16).max + 1:
+            return 'uint16'
+        return 'uint32'
+    
+    def _gdal_env(self, raster_path: str) -> Dict:
+        """GDAL options for reading a raster, authenticated for remote COGs"""
+        
+        if not raster_path.startswith("/vsicurl/"):
+            return {}
+        
+        # Imported here: workers reading local rasters don't need the
+        # acquisition stack (aiohttp, pystac_client)
+        from acquire_data import CopernicusDataAcquisition
+        
+        if self._cdse is None:
+            self._cdse = CopernicusDataAcquisition()
+        
+        return {
+            "GDAL_HTTP_HEADERS": f"Authorization: Bearer {self._cdse.get_access_token()}",
+            "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ",".join(CopernicusDataAcquisition.STREAM_EXTENSIONS),
+            "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+            "VSI_CACHE": "YES",
+            "VSI_CACHE_SIZE": 256 * 1024 * 1024
+        }
+    
     def calculate_zonal_stats(
         self, 
         raster_path: str, 
         massifs_gdf: gpd.GeoDataFrame
-    ) -> gpd.GeoDataFrame:
+    ) -> pd.DataFrame:
         """
         Calculate zonal statistics for each massif
         
         Args:
-            raster_path: Path to FSC raster file
+            raster_path: Path to FSC raster file (or /vsicurl/ URL)
             massifs_gdf: GeoDataFrame of massifs
         
         Returns:
-            GeoDataFrame with statistics added
+            DataFrame with massif_name, snow_percent and snow_area_km2
         """
         
         print(f"\n   Processing: {Path(raster_path).name}")
         
         try:
-            with rasterio.open(raster_path) as src:
+            with rasterio.Env(**self._gdal_env(raster_path)), rasterio.open(raster_path) as src:
                 # Get raster metadata
                 raster_crs = src.crs
                 raster_transform = src.transform
                 raster_resolution = src.res[0]  # Assuming square pixels
                 
-                # Reproject massifs if needed
-                massifs_proj = massifs_gdf.copy()
-                if massifs_proj.crs != raster_crs:
-                    massifs_proj = massifs_proj.to_crs(raster_crs)
+                # Reproject massifs if needed (once per CRS, products of
+                # an AOI usually share the same projection)
+                cache_key = (id(massifs_gdf), raster_crs.to_string())
+                cached = self._massif_cache.get(cache_key)
+                if cached is not None and cached[0] is massifs_gdf:
+                    massifs_proj = cached[1]
+                else:
+                    massifs_proj = massifs_gdf
+                    if massifs_proj.crs != raster_crs:
+                        massifs_proj = massifs_proj.to_crs(raster_crs)
+                    self._massif_cache[cache_key] = (massifs_gdf, massifs_proj)
                 
-                # Calculate zonal statistics
-                # FSC values are typically 0-100 (percentage)
-                stats = zonal_stats(
-                    massifs_proj.geometry,
-                    raster_path,
-                    stats=['mean', 'sum', 'count'],
-                    nodata=255,  # Common nodata value for HRSI products
-                    all_touched=True
+                n_bins = len(massifs_proj) + 1
+                pixel_sum = np.zeros(n_bins, dtype=np.float64)
+                pixel_count = np.zeros(n_bins, dtype=np.int64)
+                
+                # Read only the window covering the massifs (one raster pass)
+                bounds_window = from_bounds(*massifs_proj.total_bounds, transform=raster_transform)
+                col_off = math.floor(bounds_window.col_off)
+                row_off = math.floor(bounds_window.row_off)
+                massifs_window = Window(
+                    col_off,
+                    row_off,
+                    math.ceil(bounds_window.col_off + bounds_window.width) - col_off,
+                    math.ceil(bounds_window.row_off + bounds_window.height) - row_off
                 )
                 
-                # Add statistics to GeoDataFrame
-                stats_df = pd.DataFrame(stats)
+                try:
+                    window = massifs_window.intersection(Window(0, 0, src.width, src.height))
+                except WindowError:
+                    # Raster doesn't overlap any massif: no valid pixel anywhere
+                    window = None
+                    print("      Raster does not overlap the massifs")
+                
+                if window is not None:
+                    # FSC values are typically 0-100 (percentage)
+                    fsc = src.read(1, window=window)
+                    
+                    # Label every pixel with its massif (1..N, 0 = outside all massifs)
+                    # Pixels on a shared border go to the last massif drawn
+                    labels = rasterize(
+                        ((geom, i + 1) for i, geom in enumerate(massifs_proj.geometry)),
+                        out_shape=fsc.shape,
+                        transform=src.window_transform(window),
+                        fill=0,
+                        all_touched=True,
+                        dtype=self._label_dtype(n_bins)
+                    )
+                    
+                    # Calculate zonal statistics for all massifs at once, by
+                    # strips of rows to bound the temporary arrays
+                    for start in range(0, fsc.shape[0], self.STRIP_ROWS):
+                        strip_labels = labels[start:start + self.STRIP_ROWS]
+                        strip_fsc = fsc[start:start + self.STRIP_ROWS]
+                        valid = (strip_labels > 0) & (strip_fsc != self.NODATA)
+                        pixel_sum += np.bincount(
+                            strip_labels[valid], weights=strip_fsc[valid], minlength=n_bins
+                        )
+                        pixel_count += np.bincount(strip_labels[valid], minlength=n_bins)
+                
+                # Drop the "outside all massifs" bin
+                pixel_sum = pixel_sum[1:]
+                pixel_count = pixel_count[1:]
+                
+                stats_df = pd.DataFrame({'sum': pixel_sum, 'count': pixel_count})
+                stats_df['mean'] = stats_df['sum'] / stats_df['count'].replace(0, np.nan)
                 
                 # Calculate snow-covered area
-                # Area = count of snow pixels × resolution²
-                # Convert to km²
+                # Each pixel contributes fsc/100 of its area, so the snow area
+                # is sum(fsc)/100 × pixel area (in km²)
+                area_per_px_km2 = (raster_resolution ** 2) * 1e-6
                 stats_df['snow_area_km2'] = (
-                    stats_df['sum'] / 100.0 *  # Convert percentage to fraction
-                    stats_df['count'] *  # Number of pixels
-                    (raster_resolution ** 2) /  # Pixel area in m²
-                    1_000_000  # Convert m² to km²
+                    stats_df['sum'].to_numpy(dtype=np.float64) / 100.0 * area_per_px_km2
                 )
                 
                 # Rename columns
                 stats_df['snow_percent'] = stats_df['mean']
                 
-                # Combine with original GeoDataFrame
-                result_gdf = massifs_gdf.copy()
-                result_gdf['snow_percent'] = stats_df['snow_percent']
-                result_gdf['snow_area_km2'] = stats_df['snow_area_km2']
-                
-                # Handle NaN values (massifs outside raster extent)
-                result_gdf['snow_percent'].fillna(0.0, inplace=True)
-                result_gdf['snow_area_km2'].fillna(0.0, inplace=True)
+                # Keep only the stats, keyed by massif (geometries are joined
+                # once in process_all_rasters)
+                # NaN values = massifs without valid pixels (outside the
+                # raster extent or only nodata)
+                result_df = stats_df[['snow_percent', 'snow_area_km2']].fillna(0.0).assign(
+                    massif_name=massifs_gdf['massif_name'].values
+                )
                 
-                print(f"      Computed stats for {len(result_gdf)} massifs")
+                print(f"      Computed stats for {len(result_df)} massifs")
                 print(f"      - Resolution: {raster_resolution:.2f}m")
-                print(f"      - Mean snow %: {result_gdf['snow_percent'].mean():.1f}%")
+                print(f"      - Mean snow %: {result_df['snow_percent'].mean():.1f}%")
                 
-                return result_gdf
+                return result_df
                 
         except Exception as e:
             print(f"      Error processing {raster_path}: {e}")
@@ -163,56 +313,277 @@ class RasterProcessor:
         
         print(f"\nProcessing {len(raster_files)} raster files...\n")
         
-        # Process each raster
-        all_results = []
+        # Parse all observation dates in one vectorized call
+        obs_dates = pd.to_datetime(
+            [r['datetime'] for r in raster_files], utc=True, format='ISO8601'
+        ).date
         
-        for raster_info in raster_files:
-            raster_path = raster_info['file_path']
-            observation_date = raster_info['datetime']
-            
-            # Extract date
-            if isinstance(observation_date, str):
-                obs_date = pd.to_datetime(observation_date).date()
-            else:
-                obs_date = observation_date
-            
-            # Calculate stats
-            result_gdf = self.calculate_zonal_stats(raster_path, massifs_gdf)
+        # Preallocate one flat column per output field (rasters × massifs)
+        n_massifs = len(massifs_gdf)
+        n_rows = len(raster_files) * n_massifs
+        snow_percent = np.empty(n_rows, dtype=np.float64)
+        snow_area_km2 = np.empty(n_rows, dtype=np.float64)
+        date_obs = np.empty(n_rows, dtype='datetime64[D]')
+        massif_idx = np.empty(n_rows, dtype=np.int32)
+        n_filled = 0
+        
+        # Only rasters missing from the manifest need processing
+        manifest = self.load_manifest()
+        cached_keys = set(manifest)
+        cache_keys = [self._cache_key(r) for r in raster_files]
+        to_process = [r for r, key in zip(raster_files, cache_keys) if key not in cached_keys]
+        
+        print(f"   {len(raster_files) - len(to_process)} rasters already processed (cached)")
+        
+        # Process rasters in parallel (each raster is independent and CPU-bound)
+        max_workers = max(1, min(os.cpu_count() or 1, len(to_process)))
+        
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(str(self.massifs_file),)
+        ) as executor:
+            processed = executor.map(_process_one, to_process)
             
-            if result_gdf is not None:
-                # Add observation date
-                result_gdf['date_obs'] = obs_date
-                result_gdf['item_id'] = raster_info['item_id']
+            for raster_info, key, obs_date in zip(raster_files, cache_keys, obs_dates):
+                # Results of executor.map come in the order of to_process
+                stats_df = self._cached_or_compute(
+                    raster_info, key, cached_keys, manifest, lambda: next(processed)
+                )
                 
-                all_results.append(result_gdf)
+                if stats_df is None:
+                    continue
+                
+                # Stats rows come back in massif order
+                rows = slice(n_filled, n_filled + n_massifs)
+                snow_percent[rows] = stats_df['snow_percent'].to_numpy()
+                snow_area_km2[rows] = stats_df['snow_area_km2'].to_numpy()
+                date_obs[rows] = obs_date
+                massif_idx[rows] = np.arange(n_massifs)
+                n_filled += n_massifs
         
         # Combine all results
-        if not all_results:
+        if n_filled == 0:
             raise ValueError("No results to combine")
         
-        combined_gdf = pd.concat(all_results, ignore_index=True)
+        # Build the output table once, geometries are taken from the massifs
+        combined_gdf = self._build_observations(
+            massifs_gdf,
+            massif_idx[:n_filled],
+            date_obs[:n_filled],
+            snow_percent[:n_filled],
+            snow_area_km2[:n_filled]
+        )
         
-        # Clean up columns
-        # Keep only necessary columns
-        keep_cols = ['massif_name', 'date_obs', 'snow_percent', 'snow_area_km2', 'geometry']
+        self._save_results(combined_gdf, manifest)
         
-        # Check which columns exist
-        available_cols = [col for col in keep_cols if col in combined_gdf.columns]
+        return combined_gdf
+    
+    async def process_queue(
+        self,
+        in_queue: asyncio.Queue,
+        out_queue: asyncio.Queue
+    ) -> Optional[gpd.GeoDataFrame]:
+        """
+        Process rasters as they are acquired (pipeline mode)
         
-        # If massif_name doesn't exist, try 'name'
-        if 'massif_name' not in combined_gdf.columns:
-            if 'name' in combined_gdf.columns:
-                combined_gdf['massif_name'] = combined_gdf['name']
-                available_cols.append('massif_name')
+        Each raster entry read from in_queue is processed in the worker pool
+        and its observations are put on out_queue as a GeoDataFrame.
+        None marks the end of both queues.
+        
+        Args:
+            in_queue: Queue of raster entries (as in acquisition metadata)
+            out_queue: Queue receiving one GeoDataFrame per processed raster
+        
+        Returns:
+            Combined GeoDataFrame with all observations, None if no raster
+            could be processed
+        """
+        
+        print(f"\n{'='*60}")
+        print("Starting Raster Processing (pipeline mode)")
+        print(f"{'='*60}\n")
+        
+        # Flat columns of every processed raster (the count isn't known upfront)
+        snow_percent = []
+        snow_area_km2 = []
+        date_obs = []
+        
+        def lookup_or_compute(executor, raster_info):
+            # Runs in a thread: cache I/O and waiting on the pool stay off the loop
+            return self._cached_or_compute(
+                raster_info,
+                self._cache_key(raster_info),
+                cached_keys,
+                manifest,
+                lambda: executor.submit(_process_one, raster_info).result()
+            )
+        
+        # One waiting thread per pool worker at most, so the default thread
+        # pool stays available to the other pipeline stages
+        max_workers = os.cpu_count() or 1
+        sem = asyncio.Semaphore(max_workers)
+        
+        async def handle(executor, raster_info):
+            async with sem:
+                stats_df = await asyncio.to_thread(lookup_or_compute, executor, raster_info)
+            
+            if stats_df is None:
+                return
+            
+            obs_date = pd.to_datetime(raster_info['datetime'], utc=True, format='ISO8601').date()
+            raster_dates = np.full(n_massifs, np.datetime64(obs_date, 'D'))
+            
+            snow_percent.append(stats_df['snow_percent'].to_numpy())
+            snow_area_km2.append(stats_df['snow_area_km2'].to_numpy())
+            date_obs.append(raster_dates)
+            
+            # Observations of this raster, for the ingestion stage
+            await out_queue.put(self._build_observations(
+                massifs_gdf,
+                massif_range,
+                raster_dates,
+                snow_percent[-1],
+                snow_area_km2[-1]
+            ))
+        
+        executor = None
+        tasks = []
+        
+        try:
+            # Setup failures must still queue the end marker below, or the
+            # ingestion stage would wait forever
+            massifs_gdf = self.load_massifs()
+            manifest = self.load_manifest()
+            cached_keys = set(manifest)
+            
+            n_massifs = len(massifs_gdf)
+            massif_range = np.arange(n_massifs, dtype=np.int32)
+            
+            # Spawn rather than fork: the event loop already runs threads
+            # (to_thread workers, aiohttp resolver) when the pool starts
+            executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(str(self.massifs_file),)
+            )
+            
+            while (raster_info := await in_queue.get()) is not None:
+                tasks.append(asyncio.create_task(handle(executor, raster_info)))
+            
+            # Wait for every raster, even after a failure, so that no
+            # observations are queued after the end marker
+            task_results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            # Tasks are only left running on an early error: cancel them
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            
+            if executor is not None:
+                # Joining the workers blocks, keep it off the event loop
+                await asyncio.to_thread(executor.shutdown)
+            
+            await out_queue.put(None)
         
-        combined_gdf = combined_gdf[available_cols]
+        for task_result in task_results:
+            if isinstance(task_result, BaseException):
+                raise task_result
         
-        # Convert date to string for GeoJSON compatibility
-        if 'date_obs' in combined_gdf.columns:
-            combined_gdf['date_obs'] = combined_gdf['date_obs'].astype(str)
+        if not snow_percent:
+            return None
+        
+        # Build the output table once, geometries are taken from the massifs
+        combined_gdf = self._build_observations(
+            massifs_gdf,
+            np.tile(massif_range, len(snow_percent)),
+            np.concatenate(date_obs),
+            np.concatenate(snow_percent),
+            np.concatenate(snow_area_km2)
+        )
+        await asyncio.to_thread(self._save_results, combined_gdf, manifest)
         
-        # Save to file
-        combined_gdf.to_file(self.output_file, driver='GeoJSON')
+        return combined_gdf
+    
+    def _cached_or_compute(
+        self,
+        raster_info: Dict,
+        key: Optional[str],
+        cached_keys: set,
+        manifest: Dict,
+        compute
+    ) -> Optional[pd.DataFrame]:
+        """
+        Get the stats of a raster from the cache, or compute and cache them
+        
+        Args:
+            raster_info: Raster entry (as in acquisition metadata)
+            key: Cache key of the raster (see _cache_key)
+            cached_keys: Keys present in the manifest when processing started
+            manifest: Manifest updated with newly cached rasters
+            compute: Callable returning the stats when they aren't cached
+        
+        Returns:
+            Stats DataFrame, None if the raster couldn't be processed
+        """
+        
+        if key in cached_keys:
+            return pd.read_parquet(self.cache_dir / f"{key}.parquet")
+        
+        stats_df = compute()
+        self._store_stats(manifest, key, raster_info, stats_df)
+        
+        return stats_df
+    
+    def _build_observations(
+        self,
+        massifs_gdf: gpd.GeoDataFrame,
+        massif_idx: np.ndarray,
+        date_obs: np.ndarray,
+        snow_percent: np.ndarray,
+        snow_area_km2: np.ndarray
+    ) -> gpd.GeoDataFrame:
+        """Assemble observation columns into a GeoDataFrame with massif geometries"""
+        
+        return gpd.GeoDataFrame(
+            {
+                'massif_name': massifs_gdf['massif_name'].to_numpy()[massif_idx],
+                'date_obs': date_obs,
+                'snow_percent': snow_percent,
+                'snow_area_km2': snow_area_km2,
+            },
+            geometry=massifs_gdf.geometry.values.take(massif_idx),
+            crs=massifs_gdf.crs
+        )
+    
+    def _store_stats(
+        self,
+        manifest: Dict,
+        key: Optional[str],
+        raster_info: Dict,
+        stats_df: Optional[pd.DataFrame]
+    ) -> None:
+        """Cache the stats of a processed raster for the next runs"""
+        
+        if stats_df is None or key is None:
+            return
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        stats_df.to_parquet(self.cache_dir / f"{key}.parquet")
+        manifest[key] = _raster_source(raster_info)
+    
+    def _save_results(self, combined_gdf: gpd.GeoDataFrame, manifest: Dict) -> None:
+        """Write the combined observations and the updated manifest"""
+        
+        # Write then rename, so an interrupted run never leaves a truncated manifest
+        tmp_file = self.manifest_file.with_suffix(".json.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+        
+        # Save to GeoParquet (binary geometries, native date type)
+        combined_gdf.to_parquet(self.output_file, compression='zstd')
         
         print(f"\n{'='*60}")
         print("Processing complete!")
@@ -221,8 +592,32 @@ class RasterProcessor:
         print(f"  Date range: {combined_gdf['date_obs'].min()} to {combined_gdf['date_obs'].max()}")
         print(f"  Output saved to: {self.output_file}")
         print(f"{'='*60}\n")
-        
-        return combined_gdf
+
+
+# Per-process state for the raster worker pool
+_worker_processor = None
+_worker_massifs = None
+
+
+def _init_worker(massifs_file: str) -> None:
+    """Load the massifs once per worker process"""
+    global _worker_processor, _worker_massifs
+    
+    _worker_processor = RasterProcessor()
+    _worker_processor.massifs_file = Path(massifs_file)
+    _worker_massifs = _worker_processor.load_massifs()
+
+
+def _raster_source(raster_info: Dict) -> str:
+    """Local file, or remote COG streamed through GDAL"""
+    return raster_info.get('file_path') or f"/vsicurl/{raster_info['download_url']}"
+
+
+def _process_one(raster_info: Dict) -> pd.DataFrame:
+    """Compute zonal statistics for one raster (runs in a worker process)"""
+    
+    # Calculate stats
+    return _worker_processor.calculate_zonal_stats(_raster_source(raster_info), _worker_massifs)
 
 
 def main():
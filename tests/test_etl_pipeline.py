@@ -0,0 +1,44 @@
+"""
+Regression tests for the concurrent ETL pipeline
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("geopandas")
+pytest.importorskip("rasterio")
+pytest.importorskip("psycopg2")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import acquire_data
+import process_raster
+import ingest_to_db
+import etl_pipeline
+
+
+def test_run_pipeline_ends_when_massifs_file_is_missing(monkeypatch, tmp_path):
+    """A processing setup failure must not leave the ingestion stage waiting"""
+
+    async def acquire_nothing(self, date_ranges, queue=None):
+        return {'downloaded_files': []}
+
+    processor_init = process_raster.RasterProcessor.__init__
+
+    def init_without_massifs(self):
+        processor_init(self)
+        self.massifs_file = tmp_path / "missing.geojson"
+
+    monkeypatch.setattr(acquire_data.CopernicusDataAcquisition, "acquire_data_async", acquire_nothing)
+    monkeypatch.setattr(process_raster.RasterProcessor, "__init__", init_without_massifs)
+    monkeypatch.setattr(ingest_to_db.DatabaseIngestor, "test_connection", lambda self: True)
+
+    async def run():
+        return await asyncio.wait_for(etl_pipeline.run_pipeline(), timeout=30)
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(run())